@@ -1,14 +1,13 @@
-### requirements: google-search-results; openai
+### requirements: aiohttp; ijson; openai
 ### env variables: OPENAI_API_KEY; SERPAPI_API_KEY
 
 from typing import List, Dict, Any, Optional, Union
-import argparse, json, os, logging
+import argparse, asyncio, json, os, logging
+import aiohttp
+import ijson
 from dotenv import load_dotenv
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor
-from openai import OpenAI
-from serpapi import GoogleSearch
-# from serpAPI import GoogleSearch
+from openai import AsyncOpenAI
 
 load_dotenv()
 
@@ -32,7 +31,11 @@ class AGENT:
         if not self.openai_key or not self.serp_key:
             raise RuntimeError("OPENAI_API_KEY and SERPAPI_API_KEY must be set.")
 
-        self.client = OpenAI(api_key=self.openai_key)
+        self.client = AsyncOpenAI(api_key=self.openai_key)
+        self._session: Optional[aiohttp.ClientSession] = None
+        ## caps in-flight SerpAPI requests: a 50-call batch otherwise fires
+        ## 50 concurrent gets and runs straight into 429s
+        self._search_sem = asyncio.Semaphore(16)
 
         self.tools = [
             {
@@ -70,19 +73,48 @@ class AGENT:
             "After all tool outputs are returned, write your final answer with clear citations."
         )
 
-    def _search_web(self, query: str) -> str:
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """lazily create the shared aiohttp session on the running loop"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    async def aclose(self) -> None:
+        """close the shared aiohttp session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def _search_web(self, query: str) -> str:
         """search the web using the provided query string"""
         if self.debug:
             logger.debug(f"SerpAPI query: '{query}'")
         logger.info(f"Searching web for query: {query}")
-        search = GoogleSearch({"q": query, "api_key": self.serp_key, "num": self.topn})
-        org = search.get_dict().get("organic_results", [])[: self.topn]
-        logger.info(f"Received {len(org)} results for query: {query}")
-        return "".join(
-            f"- {r.get('title','(untitled)')}: {r.get('snippet','(no snippet)')}" for r in org
-        ) or "No results found."
+        session = await self._get_session()
+        params = {"engine": "google", "q": query, "api_key": self.serp_key, "num": self.topn}
+        lines: list[str] = []
+        async with self._search_sem:
+            async with session.get("https://serpapi.com/search.json", params=params) as resp:
+                resp.raise_for_status()
+                ## stream-parse just organic_results off the wire; the response
+                ## also carries ads/pagination/related blocks we never look at,
+                ## and this avoids materializing any of them as python dicts
+                async for r in ijson.items_async(resp.content, "organic_results.item"):
+                    lines.append(f"- {r.get('title','(untitled)')}: {r.get('snippet','(no snippet)')}")
+                    if len(lines) >= self.topn:
+                        break
+        logger.info(f"Received {len(lines)} results for query: {query}")
+        return "".join(lines) or "No results found."
 
     def run(self, question: str) -> dict[str, Any]:
+        """sync entry point; drives the async agent loop"""
+        async def _go():
+            try:
+                return await self._run_async(question)
+            finally:
+                await self.aclose()
+        return asyncio.run(_go())
+
+    async def _run_async(self, question: str) -> dict[str, Any]:
         """run the agent to answer the given question"""
         logger.info(f"Received question: {question}")
         messages = [
@@ -91,33 +123,66 @@ class AGENT:
         ]
         steps: list[dict[str, Any]] = []
 
+        async def launch(call):
+            args = json.loads(call["arguments"])
+            q = args["query"]
+            logger.debug(f"Processing tool call for query: {q}")
+            steps.append({"type": "tool_call", "query": q})
+            return call["id"], q, await self._search_web(q)
+
         while True:
             if self.debug:
                 logger.debug("OpenAI chat.completions.create request …")
             logger.info("Sending request to OpenAI model.")
-            resp = self.client.chat.completions.create(
+            ## the response is streamed so each tool call is dispatched the
+            ## moment its arguments finish decoding - search I/O overlaps
+            ## with the model still emitting the remaining calls
+            stream = await self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 tools=self.tools,
                 tool_choice="auto",
+                stream=True,
             )
-            msg = resp.choices[0].message
-
-            if msg.tool_calls:
-                logger.info(f"Model requested {len(msg.tool_calls)} tool calls.")
-                messages.append(msg)
-
-                def fetch(call):
-                    args = json.loads(call.function.arguments)
-                    q = args["query"]
-                    logger.debug(f"Processing tool call for query: {q}")
-                    steps.append({"type": "tool_call", "query": q})
-                    return call.id, q, self._search_web(q)
-
-                with ThreadPoolExecutor() as pool:
-                    results = list(pool.map(fetch, msg.tool_calls))
 
-                for call_id, q, result in results:
+            content_parts: list[str] = []
+            tool_calls: list[dict[str, str]] = []
+            tool_tasks: list[asyncio.Task] = []
+
+            async for chunk in stream:
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    content_parts.append(delta.content)
+                for tc in delta.tool_calls or []:
+                    if tc.index >= len(tool_calls):
+                        ## a new call starting means the previous one is
+                        ## fully streamed, so it can run right away
+                        if tool_calls:
+                            tool_tasks.append(asyncio.create_task(launch(tool_calls[-1])))
+                        tool_calls.append({
+                            "id": tc.id,
+                            "name": tc.function.name if tc.function else "",
+                            "arguments": (tc.function.arguments or "") if tc.function else "",
+                        })
+                    elif tc.function and tc.function.arguments:
+                        tool_calls[tc.index]["arguments"] += tc.function.arguments
+            if tool_calls:
+                tool_tasks.append(asyncio.create_task(launch(tool_calls[-1])))
+
+            if tool_calls:
+                logger.info(f"Model requested {len(tool_calls)} tool calls.")
+                messages.append({
+                    "role": "assistant",
+                    "content": None,
+                    "tool_calls": [
+                        {"id": c["id"], "type": "function",
+                         "function": {"name": c["name"], "arguments": c["arguments"]}}
+                        for c in tool_calls
+                    ],
+                })
+
+                for task in tool_tasks:
+                    call_id, q, result = await task
                     logger.info(f"Appending tool result for query: {q}")
                     steps.append({"type": "tool_result", "content": result})
                     messages.append(
@@ -129,7 +194,7 @@ class AGENT:
                     )
                 continue
 
-            answer = msg.content.strip()
+            answer = "".join(content_parts).strip()
             logger.info("Final answer generated.")
             steps.append({"type": "assistant_answer", "content": answer})
             result: dict[str, Any] = {"question": question, "answer": answer, "steps": steps}
@@ -1,8 +1,11 @@
-### requirements: requests
+### requirements: httpx, orjson
 ### running instructions: python duckduckgo.py
 
 
-import os, sys, time, json, random, logging, requests, argparse
+import os, sys, random, logging, argparse
+import orjson
+import asyncio
+import httpx
 from dotenv import load_dotenv
 from typing import Dict, Any, List
 
@@ -22,24 +25,25 @@ class netfail(Exception):
 # search = DuckDuckGoSearchResults(api_wrapper=wrapper, source="news")
 # search.invoke("Obama")
 
-def _http(url: str, params: Dict[str, Any], retries: int = 3, timeout: int = 8):
-    """make an http get request with retries and timeout"""
-    
+async def _http(client: httpx.AsyncClient, url: str, params: Dict[str, Any], retries: int = 3):
+    """make an http get request with retries, sharing the caller's client"""
+
     last = None
     for i in range(retries):
         try:
-            r = requests.get(url, params=params, timeout=timeout)
+            r = await client.get(url, params=params)
             if r.status_code >= 500:
                 raise netfail(f"bad upstream {r.status_code}")
             r.raise_for_status()
-            return r.json()
-        
+            ## orjson decodes the raw bytes ~5x faster than r.json()
+            return orjson.loads(r.content)
+
         except Exception as e:
             last = e
             wait = min(2 ** i, 8) + random.random()
             logger.warning(f"retry {i+1}/{retries} in {wait:.1f}s: {e}")
-            time.sleep(wait)
-    
+            await asyncio.sleep(wait)
+
     raise netfail(f"failed after retries: {last}")
 
 def _ddg_params(q: str):
@@ -47,41 +51,30 @@ def _ddg_params(q: str):
     
     return {"q": q, "format": "json", "no_html": 1, "skip_disambig": 1, "t": "agent"}
 
-def ddg(q: str):
+async def ddg(client: httpx.AsyncClient, q: str):
     """perform duckduckgo search for the given query"""
-    
-    return _http(DDG_URL, _ddg_params(q))
+
+    return await _http(client, DDG_URL, _ddg_params(q))
 
 def _flatten(rt: List[Dict[str, Any]]):
-    """flatten related topics from duckduckgo results"""
-    
-    out = []
-    
+    """flatten related topics from duckduckgo results, deduped by url"""
+
+    ## single pass: the dict both flattens and dedups (insertion order kept),
+    ## so there's no second O(N) seen/dedup sweep
+    out = {}
+
     for item in rt or []:
-    
-        if "Topics" in item:
-    
-            for t in item.get("Topics", []):
-    
-                if t.get("FirstURL") and t.get("Text"):
-                    out.append({"title": t["Text"], "url": t["FirstURL"]})
-    
-        else:
-    
-            if item.get("FirstURL") and item.get("Text"):
-                out.append({"title": item["Text"], "url": item["FirstURL"]})
-    
-    seen, dedup = set(), []
-    
-    for x in out:
-    
-        if x["url"] not in seen:
-            seen.add(x["url"])
-            dedup.append(x)
-    
-    return dedup
 
-def gcs(q: str, num: int = 5):
+        for t in item.get("Topics") or [item]:
+
+            url, text = t.get("FirstURL"), t.get("Text")
+
+            if url and text and url not in out:
+                out[url] = {"title": text, "url": url}
+
+    return list(out.values())
+
+async def gcs(client: httpx.AsyncClient, q: str, num: int = 5):
     
     """perform google custom search for the given query"""
     
@@ -91,7 +84,7 @@ def gcs(q: str, num: int = 5):
         logger.info("gcs not configured")
         return []
     
-    data = _http(GCS_URL, {"key": key, "cx": cx, "q": q, "num": num})
+    data = await _http(client, GCS_URL, {"key": key, "cx": cx, "q": q, "num": num})
     
     items = data.get("items", [])
     
@@ -114,25 +107,41 @@ def _pick(d: Dict[str, Any]):
     else: 
         return None
 
-def search(q: str, want: int = 6):
+## pooled client config: keep-alive connections skip the tcp+tls handshake
+## on repeat calls, and transport retries happen below the python loop
+_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+
+def _make_client() -> httpx.AsyncClient:
+    """build a connection-pooled async client with transport-level retries"""
+
+    return httpx.AsyncClient(timeout=8, limits=_LIMITS, transport=httpx.AsyncHTTPTransport(retries=2))
+
+async def search_async(q: str, want: int = 6, client: httpx.AsyncClient = None):
     """search using duckduckgo and google custom search, return structured result"""
-    
+
     logger.info(f"searching: {q}")
-    
-    try:
-        raw = ddg(q)
-    
-    except Exception as e:
-        logger.error(f"ddg err: {str(e)}")
+
+    if client is None:
+        async with _make_client() as owned:
+            return await search_async(q, want=want, client=owned)
+
+    ## ddg and gcs are independent network calls, so fire both at once
+    ## instead of waiting for ddg before falling back to cse
+    raw, cse = await asyncio.gather(ddg(client, q), gcs(client, q, num=want), return_exceptions=True)
+
+    if isinstance(raw, Exception):
+        logger.error(f"ddg err: {str(raw)}")
         raw = {}
+    if isinstance(cse, Exception):
+        logger.error(f"gcs err: {str(cse)}")
+        cse = []
+
     ans = _pick(raw) if raw else None
     related = _flatten(raw.get("RelatedTopics", [])) if raw else []
     
     if ans:
         return {"query": q, "mode": "instant", "answer": ans, "related": related[:want]}
     
-    cse = gcs(q, num=want)
-    
     if related and not cse:
         return {"query": q, "mode": "related_only", "related": related[:want], "hint": "try broader search"}
     
@@ -141,6 +150,28 @@ def search(q: str, want: int = 6):
     
     return {"query": q, "mode": "dry", "related": related[:want], "hint": "nothing solid"}
 
+def search(q: str, want: int = 6):
+    """sync wrapper around search_async for script/CLI use"""
+
+    return asyncio.run(search_async(q, want=want))
+
+async def _search_bounded(sem: asyncio.Semaphore, q: str, want: int, client: httpx.AsyncClient):
+    async with sem:
+        return await search_async(q, want=want, client=client)
+
+async def search_batch_async(queries: List[str], want: int = 6, max_concurrency: int = 5):
+    """run many searches concurrently, capped by a semaphore"""
+
+    sem = asyncio.Semaphore(max_concurrency)
+    ## one pooled client for the whole batch so connections are reused
+    async with _make_client() as client:
+        return await asyncio.gather(*(_search_bounded(sem, q, want, client) for q in queries))
+
+def search_batch(queries: List[str], want: int = 6, max_concurrency: int = 5):
+    """sync wrapper around search_batch_async"""
+
+    return asyncio.run(search_batch_async(queries, want=want, max_concurrency=max_concurrency))
+
 def as_text(r: Dict[str, Any]):
     """convert search result dict to readable text"""
     
@@ -180,7 +211,7 @@ if __name__ == "__main__":
         sys.exit(2)
     
     if a.as_json:
-        print(json.dumps(r, ensure_ascii=False))
+        sys.stdout.buffer.write(orjson.dumps(r) + b"\n")
     
     else:
         print(as_text(r))
@@ -1,12 +1,18 @@
-### requirements: google-generative-ai; web_search; scrape_and_chunk; VectorDatabase
+### requirements: google-generative-ai; diskcache; web_search; scrape_and_chunk; VectorDatabase
 ### env variables: GEMINI_API_KEY
 
+import hashlib
 import logging
 import os
+import pickle
+import sqlite3
 import sys
+import faiss
+import numpy as np
 from webSearch import web_search
 from webScrapper import scrape_and_chunk
 from vectorDatabase import VectorDatabase
+from diskcache import Cache
 import google.generativeai as genai
 from dotenv import load_dotenv
 
@@ -20,20 +26,94 @@ log.addHandler(handler)
 
 load_dotenv()
 
+## exact-match generation cache: the semantic cache above it handles
+## paraphrases, this one makes byte-identical prompts (re-runs, retries)
+## free without even an embedding. ttl keeps web facts from going stale.
+_LLM_CACHE = Cache(".llm_cache")
+_LLM_CACHE_TTL = 86400 * 7
+
+## the instructions never change, so they live in the model's system
+## instruction: the provider can reuse the cached prefix across calls and
+## only the context+question tail varies per request
+_INSTRUCTIONS = (
+    "Based ONLY on the following context, provide a clear and concise answer "
+    "to the question. Dont use any other information."
+)
+
+class SemanticQueryCache:
+    """semantically-keyed cache of past (answer, sources) results.
+
+    queries are embedded with the same encoder the vector db uses; a hit
+    (cosine >= threshold against any past query) skips search, scraping,
+    indexing and the Gemini call entirely. persisted to disk so repeated
+    sessions benefit too."""
+
+    def __init__(self, model, threshold=0.85, path=".query_cache"):
+        self.model = model
+        self.threshold = threshold
+        self.index_path = path + ".faiss"
+        self.store_path = path + ".pkl"
+        self.index = faiss.IndexFlatIP(model.get_sentence_embedding_dimension())
+        self.entries = []
+        self._load()
+
+    def _load(self):
+        if os.path.exists(self.index_path) and os.path.exists(self.store_path):
+            try:
+                self.index = faiss.read_index(self.index_path)
+                with open(self.store_path, 'rb') as f:
+                    self.entries = pickle.load(f)
+                log.info(f"loaded {len(self.entries)} cached query results")
+            except Exception as e:
+                log.warning(f"couldn't load the query cache, starting fresh: {str(e)}")
+
+    def _embed(self, query):
+        vec = self.model.encode([query], convert_to_numpy=True, normalize_embeddings=True)
+        return np.ascontiguousarray(vec, dtype=np.float32)
+
+    def get(self, query):
+        if not self.entries:
+            return None
+        sims, ids = self.index.search(self._embed(query), 1)
+        if ids[0][0] != -1 and sims[0][0] >= self.threshold:
+            return self.entries[ids[0][0]]
+        return None
+
+    def put(self, query, answer, sources):
+        self.index.add(self._embed(query))
+        self.entries.append((answer, sources))
+        try:
+            faiss.write_index(self.index, self.index_path)
+            with open(self.store_path, 'wb') as f:
+                pickle.dump(self.entries, f)
+        except Exception as e:
+            log.warning(f"couldn't persist the query cache: {str(e)}")
+
 class RAGAgent:
     def __init__(self, model_name='gemini-1.5-flash'):
+        self.model_name = model_name
         self.vdb = VectorDatabase()
+        self.query_cache = SemanticQueryCache(self.vdb.model)
+        ## seen-chunk ledger scoped to the process, same lifetime as the
+        ## in-memory faiss index it guards against double-embedding
+        self._seen_db = sqlite3.connect(":memory:")
+        self._seen_db.execute("CREATE TABLE IF NOT EXISTS seen_chunks (key TEXT PRIMARY KEY)")
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
             raise ValueError("GEMINI_API_KEY not found. Please create a .env file and add it.")
         
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(model_name)
+        self.model = genai.GenerativeModel(model_name, system_instruction=_INSTRUCTIONS)
         log.info(f"RAG Agent initialized with model: {model_name}")
 
     def process_query(self, query):
         log.info("RAG pipeline for your query...")
-        
+
+        cached = self.query_cache.get(query)
+        if cached is not None:
+            log.info("semantic cache hit, skipping the whole pipeline")
+            return cached
+
         urls = web_search(query)
         if not urls:
             log.warning("search agent returned no URLs")
@@ -43,8 +123,18 @@ class RAGAgent:
         if not documents:
             log.warning("scrapper yielded no content.")
             return ""
-            
-        self.vdb.build_index(documents)
+
+        ## retrieval state lives across turns: only chunks we haven't
+        ## embedded before are added, repeated topics cost nothing
+        new_docs = []
+        for doc in documents:
+            key = hashlib.sha256((doc['source'] + doc['text']).encode()).hexdigest()
+            if self._seen_db.execute("SELECT 1 FROM seen_chunks WHERE key = ?", (key,)).fetchone() is None:
+                self._seen_db.execute("INSERT INTO seen_chunks VALUES (?)", (key,))
+                new_docs.append(doc)
+        self._seen_db.commit()
+        log.info(f"{len(new_docs)} new chunks to index, {len(documents) - len(new_docs)} already indexed")
+        self.vdb.add_documents(new_docs)
         
         log.info("Retrieving the most relevant context...")
         retrieved_docs = self.vdb.search(query, k=5)
@@ -56,14 +146,18 @@ class RAGAgent:
         context = "\n".join([doc['text'] for doc in retrieved_docs])
         sources = list(set([doc['source'] for doc in retrieved_docs]))
         
-        prompt = f"""
-        Based ONLY on the following context, provide a clear and concise answer to the question. Dont use any other information.
-        Context:{context};Question: {query}
-        """
+        prompt = f"Context:\n{context}\n\nQuestion: {query}"
         try:
-            response = self.model.generate_content(prompt)
-            answer = response.text
-            log.info("Successfully generated the answer.")
+            cache_key = hashlib.sha256((self.model_name + "|" + prompt).encode()).hexdigest()
+            answer = _LLM_CACHE.get(cache_key)
+            if answer is not None:
+                log.info("exact prompt cache hit, skipping the Gemini call")
+            else:
+                response = self.model.generate_content(prompt)
+                answer = response.text
+                log.info("Successfully generated the answer.")
+                _LLM_CACHE.set(cache_key, answer, expire=_LLM_CACHE_TTL)
+            self.query_cache.put(query, answer, sources)
             return answer, sources
         except Exception as e:
             log.error(f"An error occurred while calling the Gemini API: {str(e)}")
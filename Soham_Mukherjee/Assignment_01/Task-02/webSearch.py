@@ -1,5 +1,6 @@
 ### requirements: duckduckgo-search
 
+import asyncio
 import logging
 from duckduckgo_search import DDGS
 
@@ -22,3 +23,26 @@ def web_search(query, num_results=5):
         logging.error(f"{str(e)}")
         return []
 
+async def _search_one(sem, query, num_results):
+    async with sem:
+        try:
+            ## the sync client runs in a worker thread; AsyncDDGS/atext were
+            ## dropped from the package, DDGS().text is the stable API
+            results = await asyncio.to_thread(
+                lambda: list(DDGS().text(query, max_results=num_results)))
+            return [result['href'] for result in results or []]
+        except Exception as e:
+            logging.error(f"batch search failed for '{query}': {str(e)}")
+            return []
+
+async def _web_search_batch(queries, num_results, max_concurrency):
+    ## the semaphore keeps at most max_concurrency queries in flight,
+    ## so a big batch doesn't hammer the search endpoint all at once
+    sem = asyncio.Semaphore(max_concurrency)
+    return await asyncio.gather(*(_search_one(sem, q, num_results) for q in queries))
+
+def web_search_batch(queries, num_results=5, max_concurrency=5):
+    """run many searches concurrently; returns one url list per query"""
+    logging.info(f"Starting batch web search for {len(queries)} queries")
+    return asyncio.run(_web_search_batch(queries, num_results, max_concurrency))
+
@@ -11,15 +11,24 @@ logger = logging.getLogger(__name__)
 class driveAgent:
     """this class handles Google Drive operations.
     this includes operations like upload, organize, move, rename, delete files and folders."""
-    def __init__(self):
-        self.service = get_service("drive", "v3")
+    def __init__(self, fresh_transport=False):
+        # fresh_transport gives this agent its own service object; needed
+        # when several agents run in parallel threads, since the shared
+        # transport can't handle concurrent requests
+        self.service = get_service("drive", "v3", fresh=fresh_transport)
+        # memoized (folder_name, parent_id) -> folder_id; organize_file hits
+        # the same few category folders for every uploaded file
+        self._folder_cache = {}
 
     def upload_file(self, filepath, folder_id=None):
         """upload a file to Google Drive."""
         file_metadata = {"name": os.path.basename(filepath)}
         if folder_id:
             file_metadata["parents"] = [folder_id]
-        media = MediaFileUpload(filepath, resumable=True)
+        # small files go up in one multipart request; the resumable protocol
+        # (initiation request + chunked PUTs) only pays off past a few MB
+        size = os.path.getsize(filepath)
+        media = MediaFileUpload(filepath, resumable=(size > 5 * 1024 * 1024), chunksize=8 * 1024 * 1024)
         uploaded_file = self.service.files().create(body=file_metadata,
             media_body=media,fields="id, name, parents, webViewLink"
         ).execute()
@@ -28,6 +37,10 @@ class driveAgent:
 
     def get_or_create_folder(self, folder_name, parent_id=None):
         """create a folder in Google Drive or find it if it exists."""
+        key = (folder_name, parent_id)
+        if key in self._folder_cache:
+            return self._folder_cache[key]
+
         query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder'"
         if parent_id is not None:
             query += f" and '{parent_id}' in parents"
@@ -37,6 +50,7 @@ class driveAgent:
         folders = results.get("files", [])
         if folders:
             logger.info(f"Found existing folder: {folder_name} ({folders[0]['id']})")
+            self._folder_cache[key] = folders[0]["id"]
             return folders[0]["id"]
         # create folder otherwise
         folder_metadata = {
@@ -48,6 +62,7 @@ class driveAgent:
             logger.info(f"parent_id: {parent_id}")
         folder = self.service.files().create(body=folder_metadata, fields="id").execute()
         logger.info(f"new folder: {folder_name} ({folder['id']})")
+        self._folder_cache[key] = folder["id"]
         return folder["id"]
 
 
@@ -15,6 +15,27 @@ class gmailAgent:
             os.makedirs(self.download_dir)
 
 
+    def _batch_get_messages(self, msg_ids, **get_kwargs):
+        """fetches many messages in a single batched HTTP request"""
+        msg_by_id = {}
+
+        def _collect(request_id, response, exception):
+            if exception is not None:
+                logger.error(f"Failed to fetch message {request_id}: {exception}")
+            else:
+                msg_by_id[request_id] = response
+
+        if not msg_ids:
+            return msg_by_id
+        batch = self.service.new_batch_http_request(callback=_collect)
+        for msg_id in msg_ids:
+            batch.add(
+                self.service.users().messages().get(userId="me", id=msg_id, **get_kwargs),
+                request_id=msg_id,
+            )
+        batch.execute()
+        return msg_by_id
+
     def list_unread_emails(self, max_results=5):
         """this function lists unread emails in the inbox"""
         results = self.service.users().messages().list(
@@ -22,17 +43,19 @@ class gmailAgent:
         ).execute()
         messages = results.get("messages", [])
         emails = []
+        # one batched multipart request instead of a round trip per message;
+        # metadata format returns just the two headers we read, not the body
+        msg_by_id = self._batch_get_messages(
+            [msg["id"] for msg in messages],
+            format="metadata", metadataHeaders=["Subject", "From"],
+        )
         for msg in messages:
-            msg_data = self.service.users().messages().get(userId="me", id=msg["id"]).execute()
-            payload = msg_data["payload"]
-            headers = payload["headers"]
-            subject = ""
-            sender = ""
-            for h in headers:
-                if h["name"] == "Subject":
-                    subject = h["value"]
-                if h["name"] == "From":
-                    sender = h["value"]
+            msg_data = msg_by_id.get(msg["id"])
+            if msg_data is None:
+                continue
+            hdrs = {h["name"]: h["value"] for h in msg_data["payload"]["headers"]}
+            subject = hdrs.get("Subject", "")
+            sender = hdrs.get("From", "")
 
             snippet = msg_data.get("snippet", "")
             emails.append({"id": msg["id"], "subject": subject, "from": sender, "snippet": snippet})
@@ -50,22 +73,41 @@ class gmailAgent:
         if not os.path.exists(self.download_dir):
             os.makedirs(self.download_dir)
 
-        for msg in messages:
-            msg_data = self.service.users().messages().get(userId="me", id=msg["id"]).execute()
-            parts = msg_data["payload"].get("parts", [])
+        msg_by_id = self._batch_get_messages([msg["id"] for msg in messages])
 
-            for part in parts:
+        # collect every attachment get into one batch as well
+        attachments = {}
+
+        def _collect_attachment(request_id, response, exception):
+            if exception is not None:
+                logger.error(f"Failed to fetch attachment {request_id}: {exception}")
+            else:
+                attachments[request_id] = response
+
+        batch = self.service.new_batch_http_request(callback=_collect_attachment)
+        filenames = {}
+        for msg in messages:
+            msg_data = msg_by_id.get(msg["id"], {})
+            for part in msg_data.get("payload", {}).get("parts", []):
                 if part.get("filename"):
                     att_id = part["body"]["attachmentId"]
-                    att = self.service.users().messages().attachments().get(
-                        userId="me", messageId=msg["id"], id=att_id
-                    ).execute()
-                    data = base64.urlsafe_b64decode(att["data"].encode("UTF-8"))
-
-                    filepath = os.path.join(self.download_dir, part["filename"])
-                    with open(filepath, "wb") as f:
-                        f.write(data)
-                    logger.info(f"Downloaded attachment: {part['filename']}")
+                    request_id = f"{msg['id']}:{att_id}"
+                    filenames[request_id] = part["filename"]
+                    batch.add(
+                        self.service.users().messages().attachments().get(
+                            userId="me", messageId=msg["id"], id=att_id
+                        ),
+                        request_id=request_id,
+                    )
+        if filenames:
+            batch.execute()
+
+        for request_id, att in attachments.items():
+            data = base64.urlsafe_b64decode(att["data"].encode("UTF-8"))
+            filepath = os.path.join(self.download_dir, filenames[request_id])
+            with open(filepath, "wb") as f:
+                f.write(data)
+            logger.info(f"Downloaded attachment: {filenames[request_id]}")
 
 
 # if __name__ == "__main__":
@@ -1,6 +1,9 @@
 # drive authentication
+import functools
+import json
 import os
-import pickle
+import orjson
+from pathlib import Path
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
@@ -14,16 +17,36 @@ TOKEN_PATH = os.path.join("config", "token.json")
 CREDENTIALS_PATH = os.path.join("config", "auth.json")
 
 
-def get_service(api_name: str, api_version: str, scopes: list = None) -> object:
+def get_service(api_name: str, api_version: str, scopes: list = None, fresh: bool = False) -> object:
     
     if scopes is None:
         scopes = SCOPES #fallback to default scopes
 
+    # the memoized service shares one httplib2.Http, which must never see
+    # concurrent requests; callers running in worker threads pass
+    # fresh=True to get their own service + transport instead
+    if fresh:
+        return _build_service(api_name, api_version, tuple(scopes))
+
+    # every agent __init__ calls this; memoize so each api is built once per process
+    return _get_service_cached(api_name, api_version, tuple(scopes))
+
+
+@functools.lru_cache(maxsize=None)
+def _get_service_cached(api_name: str, api_version: str, scopes: tuple) -> object:
+    return _build_service(api_name, api_version, scopes)
+
+
+def _build_service(api_name: str, api_version: str, scopes: tuple) -> object:
+
     creds = None
 
-    # Load saved tokens
+    # Load saved tokens (orjson parses the token file noticeably faster
+    # than the stdlib parser buried in from_authorized_user_file)
     if os.path.exists(TOKEN_PATH):
-        creds = Credentials.from_authorized_user_file(TOKEN_PATH, scopes)
+        creds = Credentials.from_authorized_user_info(
+            orjson.loads(Path(TOKEN_PATH).read_bytes()), list(scopes)
+        )
 
     # Refresh or request new tokens
     if not creds or not creds.valid:
@@ -34,11 +57,13 @@ def get_service(api_name: str, api_version: str, scopes: list = None) -> object:
             creds = flow.run_local_server(port=0)
 
         # Save tokens
-        with open(TOKEN_PATH, "w") as token_file:
-            token_file.write(creds.to_json())
+        Path(TOKEN_PATH).write_bytes(orjson.dumps(json.loads(creds.to_json())))
 
     # Build service object
-    service = build(api_name, api_version, credentials=creds)
+    # static_discovery uses the discovery docs bundled with the client library,
+    # skipping the network fetch + big JSON parse of the discovery document
+    service = build(api_name, api_version, credentials=creds,
+                    static_discovery=True, cache_discovery=False)
     return service
 
 
@@ -1,8 +1,13 @@
-import re, os
+import re, os, threading
+from concurrent.futures import ThreadPoolExecutor
 from apps.gmail import gmailAgent
 from apps.calendar import calendarAgent
 from apps.drive import driveAgent
 
+# compiled once at import; one combined scan finds date and time together
+# instead of two full passes over the email body
+_DATE_TIME_RE = re.compile(r"(?P<date>\d{4}-\d{2}-\d{2}).*?(?P<time>\d{1,2}:\d{2})", re.S)
+
 class workFlows:
     def __init__(self):
         self.gmailAgent = gmailAgent()
@@ -14,15 +19,12 @@ class workFlows:
 
     def extract_event_details(self, email_text):
             """extract event details from email text using regex."""
-            date_pattern = r"(\d{4}-\d{2}-\d{2})"
-            time_pattern = r"(\d{1,2}:\d{2})"
-            date_match = re.search(date_pattern, email_text)
-            time_match = re.search(time_pattern, email_text)
+            match = _DATE_TIME_RE.search(email_text)
             summary = "Auto-created Event"
             description = email_text[:200] 
 
-            if date_match and time_match:
-                summary = f"Meeting on {date_match.group(1)} at {time_match.group(1)}"
+            if match:
+                summary = f"Meeting on {match.group('date')} at {match.group('time')}"
 
             return summary, description
 
@@ -61,11 +63,23 @@ class workFlows:
 
         self.gmailAgent.download_attachments(max_results=max_results)
 
-        for filename in os.listdir(download_dir):
+        # one driveAgent (and transport) per worker thread: httplib2 is
+        # not thread-safe, so the shared agent can't serve parallel calls
+        local = threading.local()
+
+        def _upload_and_organize(filename):
+            if not hasattr(local, "drive"):
+                local.drive = driveAgent(fresh_transport=True)
             filepath = os.path.join(download_dir, filename)
-            if os.path.isfile(filepath):
-                print(f"⬆️ Uploading {filename} to Drive...")
-                uploaded_file = self.driveAgent.upload_file(filepath)
-                category = self.categorize_file(filename)
-                self.driveAgent.organize_file(uploaded_file["id"], category=category)
+            print(f"⬆️ Uploading {filename} to Drive...")
+            uploaded_file = local.drive.upload_file(filepath)
+            category = self.categorize_file(filename)
+            local.drive.organize_file(uploaded_file["id"], category=category)
+
+        files = [f for f in os.listdir(download_dir)
+                 if os.path.isfile(os.path.join(download_dir, f))]
+        # uploads are pure network waits, so running them on a small thread
+        # pool makes the batch cost about one upload instead of the sum
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(_upload_and_organize, files))
 
@@ -1,8 +1,10 @@
 from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional, Union
 from datetime import datetime
 
-@dataclass
+import numpy as np
+
+@dataclass(slots=True)
 class SearchResult:
     """Represents a single search result"""
     title: str
@@ -11,7 +13,7 @@ class SearchResult:
     source: str
     metadata: Dict[str, Any] = field(default_factory=dict)
 
-@dataclass
+@dataclass(slots=True)
 class SearchResponse:
     """Represents a search response with multiple results"""
     success: bool
@@ -21,7 +23,7 @@ class SearchResponse:
     response_time: float
     error_message: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class ScrapedContent:
     """Represents scraped content from a URL"""
     url: str
@@ -33,7 +35,7 @@ class ScrapedContent:
     error_message: Optional[str] = None
     metadata: Dict[str, Any] = field(default_factory=dict)
 
-@dataclass
+@dataclass(slots=True)
 class DocumentChunk:
     """Represents a chunk of text from a document"""
     content: str
@@ -41,13 +43,40 @@ class DocumentChunk:
     chunk_index: int
     metadata: Dict[str, Any] = field(default_factory=dict)
 
-@dataclass
+@dataclass(slots=True)
+class DocumentChunkBatch:
+    """Column-wise view of a list of DocumentChunks for bulk operations.
+
+    Embedding and scoring code works on whole columns (all contents, all
+    indices) rather than one chunk at a time, so keeping parallel arrays
+    avoids a Python attribute lookup per chunk in those loops."""
+    contents: List[str]
+    source_urls: List[str]
+    chunk_indices: np.ndarray
+
+    @classmethod
+    def from_chunks(cls, chunks: List["DocumentChunk"]) -> "DocumentChunkBatch":
+        return cls(
+            contents=[c.content for c in chunks],
+            source_urls=[c.source_url for c in chunks],
+            chunk_indices=np.fromiter((c.chunk_index for c in chunks), dtype=np.int32, count=len(chunks)))
+
+@dataclass(slots=True)
 class RAGResult:
     """Represents the result of a RAG query"""
     query: str
     relevant_chunks: List[DocumentChunk]
-    generated_response: str
+    # either the finished response text or a zero-arg callable producing it;
+    # callers that only read chunks/scores never pay the string build
+    response_builder: Union[str, Callable[[], str]]
     confidence_score: float
     sources: List[str]
     retrieval_time: float
-    generation_time: float
\ No newline at end of file
+    generation_time: float
+
+    @property
+    def generated_response(self) -> str:
+        """Response text, built lazily on first access and memoized."""
+        if callable(self.response_builder):
+            self.response_builder = self.response_builder()
+        return self.response_builder
\ No newline at end of file
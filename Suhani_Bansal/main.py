@@ -5,7 +5,7 @@ import os
 
 import config
 from system import RobustWebSearchRAGSystem
-from search_agents import DuckDuckGoSearchAgent, WikipediaSearchAgent, SerpApiSearchAgent, MultiSearchAgent
+from search_agents import SearchAgent, DuckDuckGoSearchAgent, WikipediaSearchAgent, SerpApiSearchAgent, MultiSearchAgent
 from data_models import SearchResult, SearchResponse
 
 # Setup logging configuration from the config file
@@ -85,6 +85,9 @@ async def test_robust_system():
         
         print(f"\n   Response Preview: {rag_result.generated_response[:300]}...\n")
 
+    # release the pooled connections shared by the search agents
+    await SearchAgent.close_session()
+
     stats = system._get_statistics()
     print("\n" + "="*50)
     print("   Final System Statistics:")
@@ -1,5 +1,6 @@
 import asyncio
-import aiohttp
+import httpx
+import random
 import re
 import time
 import logging
@@ -15,8 +16,24 @@ try:
 except ImportError:
     SCRAPING_AVAILABLE = False
 
+try:
+    from selectolax.parser import HTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
+
+try:
+    from diskcache import Cache
+    _CACHE = Cache('/tmp/ragcache')
+except ImportError:
+    _CACHE = None
+
 logger = logging.getLogger(__name__)
 
+# compiled once at import; _clean_text runs on every scraped page
+_WS = re.compile(r'\s+')
+_BAD = re.compile(r'[^\w\s.,!?;:()\-"]')
+
 class WebScraperAgent:
     """web scraper with content extraction"""
     def __init__(self, max_retries: int = 3, timeout: int = 30, rate_limit_delay: float = 1.0):
@@ -28,14 +45,19 @@ class WebScraperAgent:
         logger.info(f"WebScraperAgent initialized with max_retries={max_retries}, timeout={timeout}s")
 
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        # http/2 multiplexes concurrent requests to the same host over one
+        # connection - wikipedia-heavy result sets stop paying a TCP+TLS
+        # handshake per page
+        self.session = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+            follow_redirects=True,
             headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'})
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         if self.session:
-            await self.session.close()
+            await self.session.aclose()
 
     async def _rate_limit(self):
         now = time.time()
@@ -46,49 +68,80 @@ class WebScraperAgent:
             await asyncio.sleep(delay)
         self.last_request_time = time.time()
 
+    def _parse(self, html: str, url: str):
+        """CPU-bound extraction step; runs on a worker thread so parsing one
+        page overlaps with the other pages' network waits."""
+        if SCRAPING_AVAILABLE:
+            logger.debug(f"Attempting extraction with Trafilatura for {url}")
+            content = trafilatura.extract(html, include_comments=False, include_tables=True)
+            if content:
+                # trafilatura already holds the metadata; building a whole
+                # BeautifulSoup tree just for <title> is a second full parse
+                meta = trafilatura.extract_metadata(html)
+                title = meta.title if meta and meta.title else "No Title"
+                return title, self._clean_text(content), "trafilatura"
+
+        if SELECTOLAX_AVAILABLE:
+            # C-level tree walk: one css() call prunes all boilerplate tags
+            # without per-tag Python attribute lookups
+            logger.debug(f"Falling back to selectolax for {url}")
+            tree = HTMLParser(html)
+            title_node = tree.css_first('title')
+            title = title_node.text(strip=True) if title_node else "No Title"
+            for node in tree.css('script,style,nav,header,footer,aside'): node.decompose()
+            main_content = tree.css_first('main') or tree.css_first('article') or tree.body
+            text_content = main_content.text(separator=' ') if main_content else ""
+            return title, self._clean_text(text_content), "selectolax"
+
+        logger.debug(f"Falling back to BeautifulSoup for {url}")
+        soup = BeautifulSoup(html, 'lxml')
+        title = soup.title.string.strip() if soup.title else "No Title"
+        for element in soup(['script', 'style', 'nav', 'header', 'footer', 'aside']): element.decompose()
+        main_content = soup.find('main') or soup.find('article') or soup.body
+        text_content = main_content.get_text() if main_content else ""
+        return title, self._clean_text(text_content), "beautifulsoup"
+
     def _clean_text(self, text: str) -> str:
-        text = re.sub(r'\s+', ' ', text)
-        text = re.sub(r'[^\w\s\.,!?;:()\-"]', '', text)
-        return re.sub(r' +', ' ', text).strip()
+        # strip bad chars first, then collapse whitespace once - the old
+        # order needed a third pass to re-collapse spaces left by deletions
+        return _WS.sub(' ', _BAD.sub('', text)).strip()
 
     async def scrape_url(self, url: str) -> ScrapedContent:
+        # pages persist across runs for a day; a cache hit costs one
+        # sqlite read instead of a fetch + parse (and skips rate limiting)
+        if _CACHE is not None:
+            cached = _CACHE.get('scrape|' + url)
+            if cached is not None:
+                logger.info(f"Scrape cache hit for {url}")
+                return cached
         await self._rate_limit()
         logger.info(f"Scraping URL: {url}")
         error_msg = ""
         for attempt in range(self.max_retries):
             try:
-                async with self.session.get(url, allow_redirects=True) as response:
-                    if response.status == 200:
-                        html = await response.text()
-                        if SCRAPING_AVAILABLE:
-                            logger.debug(f"Attempting extraction with Trafilatura for {url}")
-                            content = trafilatura.extract(html, include_comments=False, include_tables=True)
-                            if content:
-                                soup = BeautifulSoup(html, 'html.parser')
-                                title = soup.title.string.strip() if soup.title else "No Title"
-                                cleaned_content = self._clean_text(content)
-                                logger.info(f"Successfully extracted content from {url} using Trafilatura.")
-                                return ScrapedContent(
-                                    url=url, title=title, content=cleaned_content, text_length=len(cleaned_content),
-                                    scrape_timestamp=datetime.now(), success=True, metadata={"method": "trafilatura"})
-                        
-                        logger.debug(f"Falling back to BeautifulSoup for {url}")
-                        soup = BeautifulSoup(html, 'html.parser')
-                        title = soup.title.string.strip() if soup.title else "No Title"
-                        for element in soup(['script', 'style', 'nav', 'header', 'footer', 'aside']): element.decompose()
-                        main_content = soup.find('main') or soup.find('article') or soup.body
-                        text_content = main_content.get_text() if main_content else ""
-                        cleaned_content = self._clean_text(text_content)
-                        logger.info(f"Successfully extracted content from {url} using BeautifulSoup.")
-                        return ScrapedContent(
-                            url=url, title=title, content=cleaned_content, text_length=len(cleaned_content),
-                            scrape_timestamp=datetime.now(), success=True, metadata={"method": "beautifulsoup"})
-                    else:
-                        error_msg = f"HTTP {response.status}"
+                # short first-try timeout, lengthened on retry: a slow host
+                # fails fast and frees its semaphore slot instead of
+                # holding it for the full budget
+                response = await self.session.get(url, timeout=8 + 4 * attempt)
+                if response.status_code == 200:
+                    html = response.text
+                    # parsing off the event loop: other scrapes keep
+                    # their sockets moving while this page is extracted
+                    title, cleaned_content, method = await asyncio.to_thread(self._parse, html, url)
+                    logger.info(f"Successfully extracted content from {url} using {method}.")
+                    scraped = ScrapedContent(
+                        url=url, title=title, content=cleaned_content, text_length=len(cleaned_content),
+                        scrape_timestamp=datetime.now(), success=True, metadata={"method": method})
+                    if _CACHE is not None:
+                        _CACHE.set('scrape|' + url, scraped, expire=86400)
+                    return scraped
+                else:
+                    error_msg = f"HTTP {response.status_code}"
             except Exception as e:
                 error_msg = str(e)
                 logger.warning(f"Attempt {attempt + 1}/{self.max_retries} failed for {url}: {e}")
-                if attempt < self.max_retries - 1: await asyncio.sleep(2 ** attempt)
+                # jittered backoff so concurrent failures don't retry in lockstep
+                if attempt < self.max_retries - 1: await asyncio.sleep((2 ** attempt) * (0.5 + random.random()))
 
         logger.error(f"All {self.max_retries} attempts failed for URL: {url}. Last error: {error_msg}")
         return ScrapedContent(url=url, title="", content="", text_length=0, scrape_timestamp=datetime.now(), success=False, error_message=error_msg)
@@ -97,6 +150,14 @@ class WebScraperAgent:
         logger.info(f"Starting concurrent scrape for {len(urls)} URLs with max concurrency of {max_concurrent}.")
         semaphore = asyncio.Semaphore(max_concurrent)
         async def scrape_with_semaphore(url):
-            async with semaphore: return await self.scrape_url(url)
+            async with semaphore:
+                try:
+                    # hard wall-clock budget per url, retries included
+                    return await asyncio.wait_for(self.scrape_url(url), timeout=self.timeout)
+                except asyncio.TimeoutError:
+                    logger.error(f"Scrape budget of {self.timeout}s exhausted for {url}")
+                    return ScrapedContent(url=url, title="", content="", text_length=0,
+                                          scrape_timestamp=datetime.now(), success=False,
+                                          error_message="scrape timeout")
         tasks = [scrape_with_semaphore(url) for url in urls]
         return await asyncio.gather(*tasks)
\ No newline at end of file
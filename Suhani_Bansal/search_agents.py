@@ -1,10 +1,11 @@
 import time
 import asyncio
 import aiohttp
+import hashlib
 import logging
 import os
 from abc import ABC, abstractmethod
-from urllib.parse import quote_plus
+from urllib.parse import quote_plus, urlsplit, parse_qsl, urlencode
 from typing import List
 
 from data_models import SearchResult, SearchResponse
@@ -15,19 +16,81 @@ try:
 except ImportError:
     BS4_AVAILABLE = False
 
+try:
+    from diskcache import Cache
+    _CACHE = Cache('/tmp/ragcache')
+except ImportError:
+    _CACHE = None
+
 logger = logging.getLogger(__name__)
 
+# hosts whose result pages are essentially never worth scraping
+_BLOCKED_DOMAINS = {'pinterest.com', 'tiktok.com', 'facebook.com', 'instagram.com'}
+
+def _canon(url: str) -> str:
+    """Canonical form of a URL for deduplication: lowercased host without
+    www., no fragment, no tracking params, no trailing slash."""
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query) if not k.startswith('utm_')])
+    path = parts.path.rstrip('/')
+    return f"{host}{path}?{query}" if query else f"{host}{path}"
+
+def _blocked(url: str) -> bool:
+    host = urlsplit(url).netloc.lower()
+    return any(host == d or host.endswith('.' + d) for d in _BLOCKED_DOMAINS)
+
 class SearchAgent(ABC):
     """Abstract base class for search agents"""
+
+    # One pooled session shared by every agent: per-call ClientSession
+    # construction pays a fresh TCP/TLS handshake that dominates a search.
+    _session = None
+
+    # successful responses are cached on disk with a TTL so adjacent
+    # queries across runs skip the HTTP round trip (and the rate limiter)
+    _CACHE_TTL = 3600
+
     def __init__(self, base_delay: float = 1.0):
         self.base_delay = base_delay
         self.last_request_time = 0
 
+    def _cache_key(self, query: str, num_results: int) -> str:
+        return "search|" + hashlib.sha1(f"{type(self).__name__}|{query}|{num_results}".encode()).hexdigest()
+
+    def _cached_response(self, query: str, num_results: int):
+        if _CACHE is None:
+            return None
+        hit = _CACHE.get(self._cache_key(query, num_results))
+        if hit is not None:
+            logger.info(f"{type(self).__name__} cache hit for '{query}'")
+        return hit
+
+    def _store_response(self, query: str, num_results: int, response: SearchResponse):
+        if _CACHE is not None and response.success:
+            _CACHE.set(self._cache_key(query, num_results), response, expire=self._CACHE_TTL)
+
     @abstractmethod
     async def search(self, query: str, num_results: int = 10) -> SearchResponse:
         """Perform a search and return results"""
         pass
 
+    @classmethod
+    async def _get_session(cls) -> aiohttp.ClientSession:
+        """Lazily create the shared pooled session on the running loop."""
+        if SearchAgent._session is None or SearchAgent._session.closed:
+            SearchAgent._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300, keepalive_timeout=60))
+        return SearchAgent._session
+
+    @classmethod
+    async def close_session(cls):
+        """Close the shared session (call once at shutdown)."""
+        if SearchAgent._session is not None and not SearchAgent._session.closed:
+            await SearchAgent._session.close()
+
     async def _rate_limit(self):
         """Implement rate limiting"""
         now = time.time()
@@ -41,6 +104,9 @@ class SearchAgent(ABC):
 class DuckDuckGoSearchAgent(SearchAgent):
     """DuckDuckGo search agent using their HTML search page."""
     async def search(self, query: str, num_results: int = 10) -> SearchResponse:
+        cached = self._cached_response(query, num_results)
+        if cached is not None:
+            return cached
         await self._rate_limit()
         start_time = time.time()
         encoded_query = quote_plus(query)
@@ -52,19 +118,21 @@ class DuckDuckGoSearchAgent(SearchAgent):
         }
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(search_url, headers=headers, timeout=15) as response:
-                    if response.status == 200:
-                        html = await response.text()
-                        results = self._parse_duckduckgo_results(html, query)
-                        logger.info(f"DuckDuckGo search successful, found {len(results)} results.")
-                        return SearchResponse(
-                            success=True, results=results[:num_results], source="duckduckgo",
-                            total_results=len(results), response_time=time.time() - start_time
-                        )
-                    else:
-                        logger.error(f"DuckDuckGo search failed with HTTP status {response.status}")
-                        raise Exception(f"HTTP {response.status}")
+            session = await self._get_session()
+            async with session.get(search_url, headers=headers, timeout=15) as response:
+                if response.status == 200:
+                    html = await response.text()
+                    results = self._parse_duckduckgo_results(html, query)
+                    logger.info(f"DuckDuckGo search successful, found {len(results)} results.")
+                    response_obj = SearchResponse(
+                        success=True, results=results[:num_results], source="duckduckgo",
+                        total_results=len(results), response_time=time.time() - start_time
+                    )
+                    self._store_response(query, num_results, response_obj)
+                    return response_obj
+                else:
+                    logger.error(f"DuckDuckGo search failed with HTTP status {response.status}")
+                    raise Exception(f"HTTP {response.status}")
         except Exception as e:
             logger.error(f"An error occurred during DuckDuckGo search: {e}", exc_info=True)
             return SearchResponse(
@@ -96,7 +164,11 @@ class DuckDuckGoSearchAgent(SearchAgent):
 
 class WikipediaSearchAgent(SearchAgent):
     """Wikipedia search using their API"""
+    _CACHE_TTL = 86400  # encyclopedic results go stale much slower than news
     async def search(self, query: str, num_results: int = 10) -> SearchResponse:
+        cached = self._cached_response(query, num_results)
+        if cached is not None:
+            return cached
         await self._rate_limit()
         start_time = time.time()
         logger.info(f"Searching Wikipedia for '{query}'...")
@@ -107,25 +179,27 @@ class WikipediaSearchAgent(SearchAgent):
             'srprop': 'snippet|titlesnippet|size'
         }
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(search_url, params=params, timeout=10) as response:
-                    if response.status == 200:
-                        data, results = await response.json(), []
-                        if 'query' in data and 'search' in data['query']:
-                            for item in data['query']['search']:
-                                title = item.get('title', '')
-                                snippet = item.get('snippet', '').replace('<span class="searchmatch">', '').replace('</span>', '')
-                                url = f"https://en.wikipedia.org/wiki/{quote_plus(title.replace(' ', '_'))}"
-                                results.append(SearchResult(
-                                    title=f"Wikipedia: {title}", url=url, snippet=snippet, source="wikipedia",
-                                    metadata={"size": item.get('size', 0)}))
-                        logger.info(f"Wikipedia search successful, found {len(results)} results.")
-                        return SearchResponse(
-                            success=True, results=results, source="wikipedia",
-                            total_results=len(results), response_time=time.time() - start_time)
-                    else:
-                        logger.error(f"Wikipedia search failed with HTTP status {response.status}")
-                        raise Exception(f"HTTP {response.status}")
+            session = await self._get_session()
+            async with session.get(search_url, params=params, timeout=10) as response:
+                if response.status == 200:
+                    data, results = await response.json(), []
+                    if 'query' in data and 'search' in data['query']:
+                        for item in data['query']['search']:
+                            title = item.get('title', '')
+                            snippet = item.get('snippet', '').replace('<span class="searchmatch">', '').replace('</span>', '')
+                            url = f"https://en.wikipedia.org/wiki/{quote_plus(title.replace(' ', '_'))}"
+                            results.append(SearchResult(
+                                title=f"Wikipedia: {title}", url=url, snippet=snippet, source="wikipedia",
+                                metadata={"size": item.get('size', 0)}))
+                    logger.info(f"Wikipedia search successful, found {len(results)} results.")
+                    response_obj = SearchResponse(
+                        success=True, results=results, source="wikipedia",
+                        total_results=len(results), response_time=time.time() - start_time)
+                    self._store_response(query, num_results, response_obj)
+                    return response_obj
+                else:
+                    logger.error(f"Wikipedia search failed with HTTP status {response.status}")
+                    raise Exception(f"HTTP {response.status}")
         except Exception as e:
             logger.error(f"An error occurred during Wikipedia search: {e}", exc_info=True)
             return SearchResponse(
@@ -143,6 +217,9 @@ class SerpApiSearchAgent(SearchAgent):
         super().__init__()
 
     async def search(self, query: str, num_results: int = 10) -> SearchResponse:
+        cached = self._cached_response(query, num_results)
+        if cached is not None:
+            return cached
         await self._rate_limit()
         start_time = time.time()
         logger.info(f"Searching Google via SerpApi for '{query}'...")
@@ -160,24 +237,26 @@ class SerpApiSearchAgent(SearchAgent):
         headers = {'User-Agent': 'python:web-search-rag:v1.0'}
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(search_url, headers=headers, params=params, timeout=20) as response:
-                    if response.status == 200:
-                        data, results = await response.json(), []
-                        for item in data.get("organic_results", []):
-                            title, url, snippet = item.get('title', ''), item.get('link', ''), item.get('snippet', '')
-                            if title and url:
-                                results.append(SearchResult(
-                                    title=f"Google (SerpApi): {title}", url=url, snippet=snippet, source="serpapi_google",
-                                    metadata={"position": item.get('position', 0)}))
+            session = await self._get_session()
+            async with session.get(search_url, headers=headers, params=params, timeout=20) as response:
+                if response.status == 200:
+                    data, results = await response.json(), []
+                    for item in data.get("organic_results", []):
+                        title, url, snippet = item.get('title', ''), item.get('link', ''), item.get('snippet', '')
+                        if title and url:
+                            results.append(SearchResult(
+                                title=f"Google (SerpApi): {title}", url=url, snippet=snippet, source="serpapi_google",
+                                metadata={"position": item.get('position', 0)}))
                         
-                        logger.info(f"SerpApi search successful, found {len(results)} results.")
-                        return SearchResponse(
-                            success=True, results=results, source="serpapi_google",
-                            total_results=len(results), response_time=time.time() - start_time)
-                    else:
-                        logger.error(f"SerpApi search failed with HTTP status {response.status}. Response: {await response.text()}")
-                        raise Exception(f"HTTP {response.status}")
+                    logger.info(f"SerpApi search successful, found {len(results)} results.")
+                    response_obj = SearchResponse(
+                        success=True, results=results, source="serpapi_google",
+                        total_results=len(results), response_time=time.time() - start_time)
+                    self._store_response(query, num_results, response_obj)
+                    return response_obj
+                else:
+                    logger.error(f"SerpApi search failed with HTTP status {response.status}. Response: {await response.text()}")
+                    raise Exception(f"HTTP {response.status}")
         except Exception as e:
             logger.error(f"An error occurred during SerpApi search: {e}", exc_info=True)
             return SearchResponse(
@@ -211,8 +290,12 @@ class MultiSearchAgent:
         for response in responses:
             if isinstance(response, SearchResponse) and response.success:
                 for result in response.results:
-                    if result.url not in seen_urls:
-                        seen_urls.add(result.url)
+                    # canonical dedup catches the same page reported with
+                    # different tracking params / www. / trailing slashes,
+                    # and blocked domains never reach the scraper at all
+                    key = _canon(result.url)
+                    if key not in seen_urls and not _blocked(result.url):
+                        seen_urls.add(key)
                         all_results.append(result)
                 successful_sources.append(response.source)
 
@@ -1,7 +1,11 @@
+import hashlib
+import os
 import time
 import logging
 from urllib.parse import urlparse
+import mmap
 import pickle
+import struct
 import numpy as np
 
 from search_agents import DuckDuckGoSearchAgent, WikipediaSearchAgent, MultiSearchAgent
@@ -10,6 +14,9 @@ from rag_agent import ImprovedRAGAgent, EMBEDDINGS_AVAILABLE
 from data_models import RAGResult
 import config
 
+if EMBEDDINGS_AVAILABLE:
+    import faiss
+
 logger = logging.getLogger(__name__)
 
 class RobustWebSearchRAGSystem:
@@ -25,6 +32,22 @@ class RobustWebSearchRAGSystem:
         
         self.rag_agent = ImprovedRAGAgent(
             use_embeddings=use_embeddings, **self.rag_config)
+        # full-pipeline result cache: an identical query against an
+        # unchanged index returns the stored dict without searching,
+        # scraping, or touching the RAG agent at all
+        self._result_cache: dict = {}
+
+    _RESULT_CACHE_TTL = 300
+
+    def _index_fingerprint(self) -> str:
+        """Digest of (source_url, chunk_count) pairs; changes whenever the index does."""
+        counts = {}
+        for chunk in self.rag_agent.document_chunks:
+            counts[chunk.source_url] = counts.get(chunk.source_url, 0) + 1
+        h = hashlib.blake2b(digest_size=16)
+        for url in sorted(counts):
+            h.update(f"{url}:{counts[url]};".encode())
+        return h.hexdigest()
     
     async def query_with_rag(self, query: str, search_first: bool = True, num_search_results: int = 8) -> dict:
         logger.info(f"--- Starting new RAG pipeline for query: '{query}' ---")
@@ -32,6 +55,13 @@ class RobustWebSearchRAGSystem:
         try:
             if not query.strip(): return {"error": "Empty query provided"}
             
+            cache_key = (hashlib.sha256(query.strip().lower().encode()).hexdigest(),
+                         self._index_fingerprint())
+            cached = self._result_cache.get(cache_key)
+            if cached is not None and time.time() - cached[0] < self._RESULT_CACHE_TTL:
+                logger.info("Pipeline cache hit - returning stored result.")
+                return cached[1]
+            
             scraped_contents = []
             if search_first:
                 logger.info("[STEP 1/4] Performing multi-agent search.")
@@ -55,39 +85,90 @@ class RobustWebSearchRAGSystem:
             
             total_time = time.time() - start_time
             logger.info(f"--- RAG pipeline completed in {total_time:.2f}s ---")
-            return {
+            result = {
                 "success": True, "rag_result": rag_result, "scraped_contents": scraped_contents,
                 "total_processing_time": total_time, "statistics": self._get_statistics()}
+            # store under the post-indexing fingerprint, and drop whatever
+            # has already expired while we're here
+            now = time.time()
+            self._result_cache = {k: v for k, v in self._result_cache.items()
+                                  if now - v[0] < self._RESULT_CACHE_TTL}
+            self._result_cache[(cache_key[0], self._index_fingerprint())] = (now, result)
+            return result
         except Exception as e:
             logger.critical(f"A critical error occurred in the RAG pipeline: {e}", exc_info=True)
             return {"error": f"System error: {str(e)}"}
 
     def _get_statistics(self) -> dict:
+        # single pass over the chunks; this runs after every query, and the
+        # old version walked the list twice and built a throwaway array
         doc_chunks = self.rag_agent.document_chunks
+        total_words = 0
+        sources = set()
+        for chunk in doc_chunks:
+            total_words += chunk.metadata.get('word_count', 0)
+            sources.add(chunk.source_url)
         return {
             "total_chunks": len(doc_chunks),
-            "unique_sources": len(set(c.source_url for c in doc_chunks)),
+            "unique_sources": len(sources),
             "embeddings_enabled": self.rag_agent.use_embeddings,
-            "avg_chunk_size": np.mean([c.metadata.get('word_count', 0) for c in doc_chunks]) if doc_chunks else 0
+            "avg_chunk_size": total_words / len(doc_chunks) if doc_chunks else 0
         }
 
     def save_index(self, filepath: str):
         logger.info(f"Saving index to {filepath}...")
-        with open(filepath, 'wb') as f:
-            pickle.dump({
-                "document_chunks": self.rag_agent.document_chunks,
-                "embeddings": getattr(self.rag_agent, 'embeddings', None)
-            }, f)
+        embeddings = getattr(self.rag_agent, 'embeddings', None)
+        # protocol-5 out-of-band buffers: the embedding matrix bypasses the
+        # pickle stream and is written raw (length-prefixed) to a side file
+        # at memcpy speed, so load can hand it back with no decode pass
+        with open(filepath + '.buf', 'wb') as buf_file:
+            def _write_buffer(buf):
+                raw = buf.raw()
+                buf_file.write(struct.pack('<Q', raw.nbytes))
+                buf_file.write(raw)
+            with open(filepath, 'wb') as f:
+                pickle.dump({
+                    "document_chunks": self.rag_agent.document_chunks,
+                    # fp16 on disk: half the file size, recast to fp32 on load
+                    "embeddings": embeddings.astype(np.float16) if embeddings is not None else None
+                }, f, protocol=5, buffer_callback=_write_buffer)
+        index = getattr(self.rag_agent, 'index', None)
+        if EMBEDDINGS_AVAILABLE and index is not None and index.ntotal > 0:
+            # persist the trained index itself so load never has to
+            # re-train or re-add a single vector
+            faiss.write_index(index, filepath + '.faiss')
         logger.info("Index saved successfully.")
 
     def load_index(self, filepath: str):
         logger.info(f"Loading index from {filepath}...")
-        with open(filepath, 'rb') as f: data = pickle.load(f)
-        
-        self.rag_agent.document_chunks = data["document_chunks"]
-        if self.rag_agent.use_embeddings and data.get("embeddings") is not None:
-            self.rag_agent.embeddings = data["embeddings"]
-            if EMBEDDINGS_AVAILABLE:
-                # ... (FAISS index creation logic from rag_agent.py) ...
-                logger.info("FAISS index successfully loaded and rebuilt.")
+        with open(filepath + '.buf', 'rb') as buf_file:
+            mm = mmap.mmap(buf_file.fileno(), 0, access=mmap.ACCESS_READ) if buf_file.seek(0, 2) else None
+            buf_file.seek(0)
+
+            def _buffers():
+                # walk the length-prefixed buffers; each one is served as a
+                # zero-copy view into the mapped file
+                view, offset = memoryview(mm), 0
+                while offset < len(mm):
+                    (nbytes,) = struct.unpack_from('<Q', view, offset)
+                    offset += 8
+                    yield view[offset:offset + nbytes]
+                    offset += nbytes
+
+            with open(filepath, 'rb') as f:
+                data = pickle.load(f, buffers=_buffers() if mm is not None else None)
+
+            self.rag_agent.document_chunks = data["document_chunks"]
+            # chunks and vectors alone don't make the agent queryable;
+            # rebuild the TF-IDF rows, word sets and dedup ledger too
+            self.rag_agent.rebuild_derived_state()
+            if self.rag_agent.use_embeddings and data.get("embeddings") is not None:
+                self.rag_agent.embeddings = data["embeddings"]
+                if EMBEDDINGS_AVAILABLE and os.path.exists(filepath + '.faiss'):
+                    # mmap'd read-only load: the graph and codes page in
+                    # lazily on first search instead of being copied into
+                    # the heap up front
+                    self.rag_agent.index = faiss.read_index(
+                        filepath + '.faiss', faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+                    logger.info("FAISS index loaded from mmap'd file.")
         logger.info(f"Index loaded successfully with {len(self.rag_agent.document_chunks)} chunks.")
\ No newline at end of file
@@ -1,21 +1,89 @@
 """
 This implements a web search, scraping, and RAG pipeline.
 """
+import asyncio
+import hashlib
 import os
+import re
+import time
+import aiohttp
+import faiss
+import lxml.html
+import numpy as np
 import requests
-from bs4 import BeautifulSoup
+import torch
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import google.generativeai as genai
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
+from sentence_transformers import CrossEncoder
+from urllib.parse import urlparse
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_core.documents import Document
 from dotenv import load_dotenv
+from diskcache import Cache
 from WebSearchAgents import fallback_search
 
 load_dotenv()
 
+_WS = re.compile(r'\s+')
+
+# Pages are cut off past this size: the tail of a huge page is rarely
+# article text, and the cap bounds peak memory per URL.
+MAX_BYTES = 2_000_000
+
+# One pooled session for the sync scrape path: keep-alive connections get
+# reused across same-host URLs, and transient 429/5xx responses retry with
+# a short backoff instead of surfacing immediately.
+_SESSION = requests.Session()
+_SESSION.headers.update({'User-Agent': 'Mozilla/5.0', 'Accept-Encoding': 'gzip, br'})
+_adapter = HTTPAdapter(pool_maxsize=32, max_retries=Retry(
+    total=2, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504]))
+_SESSION.mount('https://', _adapter)
+_SESSION.mount('http://', _adapter)
+
+_EMBEDDING_CACHE = Cache("./emb_cache")
+
+class CachedEmbeddings(HuggingFaceEmbeddings):
+    """HuggingFaceEmbeddings with a disk cache, so repeated chunks skip the model."""
+    def _cache_key(self, text: str) -> str:
+        """Key a text by content hash plus model name so model swaps never collide."""
+        return hashlib.blake2b(text.encode(), digest_size=16).hexdigest() + "|" + self.model_name
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed only the cache misses, in one batched model call."""
+        vectors = [_EMBEDDING_CACHE.get(self._cache_key(text)) for text in texts]
+        misses = [i for i, vector in enumerate(vectors) if vector is None]
+        if misses:
+            fresh = super().embed_documents([texts[i] for i in misses])
+            for i, vector in zip(misses, fresh):
+                _EMBEDDING_CACHE.set(self._cache_key(texts[i]), vector)
+                vectors[i] = vector
+        return vectors
+    
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, reusing the cached vector when the text repeats."""
+        key = self._cache_key("query|" + text)
+        vector = _EMBEDDING_CACHE.get(key)
+        if vector is None:
+            vector = super().embed_query(text)
+            _EMBEDDING_CACHE.set(key, vector)
+        return vector
+
+def _make_embeddings() -> CachedEmbeddings:
+    """Build the embedding model, preferring the ONNX Runtime backend."""
+    # ONNX Runtime's fused kernels roughly double CPU encode throughput for
+    # MiniLM; optimum/onnxruntime are optional, so torch stays the fallback.
+    try:
+        return CachedEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2",
+                                model_kwargs={"backend": "onnx"})
+    except Exception:
+        return CachedEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+
 class ScrapedData(BaseModel):
     """Data model for storing scraped web page information."""
     url: str
@@ -29,78 +97,192 @@ class QueryResult(BaseModel):
 
 class WebScraper:
     """Scrapes web pages and extracts clean text content."""
-    def scrape_url(self, url: str) -> ScrapedData:
-        """Scrape a single URL and return its cleaned content and title."""
-        response = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=10)
-        soup = BeautifulSoup(response.content, 'html.parser')
+    def __init__(self):
+        """Track when each domain was last hit so we stay polite under concurrency."""
+        self._domain_next_slot: Dict[str, float] = {}
+    
+    def _parse(self, url: str, html: bytes) -> ScrapedData:
+        """Parse raw HTML into cleaned content and a title in a single lxml pass."""
+        tree = lxml.html.fromstring(html)
         
-        for element in soup(['script', 'style', 'nav', 'footer', 'header']):
-            element.decompose()
+        title_nodes = tree.xpath('//title/text()')
+        title = title_nodes[0].strip() if title_nodes else "No Title"
         
-        title = soup.find('title').get_text().strip() if soup.find('title') else "No Title"
-        content = ' '.join(soup.get_text(separator=' ', strip=True).split())
+        # One XPath walk that skips boilerplate subtrees as it goes, instead
+        # of decompose() mutations followed by a second full get_text() pass.
+        texts = tree.xpath('//body//text()[not(ancestor::script or ancestor::style or '
+                           'ancestor::nav or ancestor::footer or ancestor::header)]')
+        content = _WS.sub(' ', ' '.join(texts)).strip()
         
         return ScrapedData(url=url, title=title, content=content)
     
+    def scrape_url(self, url: str) -> ScrapedData:
+        """Scrape a single URL and return its cleaned content and title."""
+        response = _SESSION.get(url, timeout=10, stream=True)
+        parts, received = [], 0
+        for chunk in response.iter_content(chunk_size=65536):
+            parts.append(chunk)
+            received += len(chunk)
+            if received >= MAX_BYTES:
+                break
+        response.close()
+        return self._parse(url, b''.join(parts))
+    
+    async def _throttle(self, url: str) -> None:
+        """Reserve the next 200ms slot for the URL's domain and wait for it."""
+        domain = urlparse(url).netloc
+        now = time.monotonic()
+        slot = max(now, self._domain_next_slot.get(domain, 0.0))
+        self._domain_next_slot[domain] = slot + 0.2
+        if slot > now:
+            await asyncio.sleep(slot - now)
+    
+    async def _scrape_one(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, url: str) -> ScrapedData:
+        """Download one URL under the concurrency cap and parse it off the event loop."""
+        async with semaphore:
+            await self._throttle(url)
+            async with session.get(url, headers={'User-Agent': 'Mozilla/5.0'},
+                                   timeout=aiohttp.ClientTimeout(total=10)) as response:
+                # Stream in 64KB chunks and stop at the byte cap instead of
+                # read()-ing an arbitrarily large body into memory.
+                parts, received = [], 0
+                async for chunk in response.content.iter_chunked(65536):
+                    parts.append(chunk)
+                    received += len(chunk)
+                    if received >= MAX_BYTES:
+                        break
+                html = b''.join(parts)
+        # Parsing is CPU-bound, so it runs in the executor and overlaps the
+        # other downloads instead of blocking the event loop.
+        return await asyncio.get_running_loop().run_in_executor(None, self._parse, url, html)
+    
+    async def _scrape_all(self, urls: List[str]) -> List[ScrapedData]:
+        """Scrape all URLs concurrently over one pooled HTTP session."""
+        semaphore = asyncio.Semaphore(16)
+        async with aiohttp.ClientSession() as session:
+            results = await asyncio.gather(
+                *(self._scrape_one(session, semaphore, url) for url in urls),
+                return_exceptions=True)
+        return [result for result in results if isinstance(result, ScrapedData)]
+    
     def scrape_from_search(self, search_results: List[Dict[str, Any]]) -> List[ScrapedData]:
         """Scrape all URLs from search results and return a list of ScrapedData."""
-        scraped_data = []
-        for result in search_results:
-            url = result.get('source', '')
-            if url:
-                scraped_data.append(self.scrape_url(url))
-        return scraped_data
+        urls = [result.get('source', '') for result in search_results if result.get('source', '')]
+        return asyncio.run(self._scrape_all(urls))
 
 class RAGSystem:
     """Builds a vector store from scraped data and answers questions using a language model."""
     def __init__(self):
         """Initialize embeddings, splitter, vectorstore, and language model."""
-        self.embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+        self.embeddings = _make_embeddings()
         self.splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
         self.vectorstore = None
+        self.known_urls: set = set()
+        
+        # Cross-encoder reranker: scores (query, passage) pairs jointly,
+        # much sharper than bi-encoder cosine for picking final context.
+        self.reranker = CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2")
         
         genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
         self.model = genai.GenerativeModel('gemini-1.5-flash')
     
     def build_vectorstore(self, scraped_data: List[ScrapedData]) -> None:
-        """Build a FAISS vector store from the provided scraped data."""
+        """Build the FAISS vector store, or extend it with pages it hasn't seen."""
         documents = [Document(page_content=data.content, metadata={"source": data.url, "title": data.title}) 
-                    for data in scraped_data if data.content]
+                    for data in scraped_data if data.content and data.url not in self.known_urls]
+        if not documents:
+            return
+        self.known_urls.update(doc.metadata["source"] for doc in documents)
         
         chunks = self.splitter.split_documents(documents)
-        self.vectorstore = FAISS.from_documents(chunks, self.embeddings)
+        if self.vectorstore is not None:
+            # The store persists across queries; only the delta gets
+            # embedded and added, everything already indexed is free.
+            self.vectorstore.add_documents(chunks)
+            return
+        vectors = np.asarray(self.embeddings.embed_documents([chunk.page_content for chunk in chunks]), dtype=np.float32)
+        faiss.normalize_L2(vectors)
+        
+        # Large corpora get a compressed OPQ+IVF+PQ index (48x smaller than
+        # flat fp32, searches only a few inverted lists per query); small
+        # ones get an HNSW graph, which needs no training stage at all.
+        if len(vectors) >= 10_000:
+            index = faiss.index_factory(vectors.shape[1], "OPQ16,IVF256,PQ16", faiss.METRIC_INNER_PRODUCT)
+            # With a faiss-gpu build and a visible CUDA device, k-means
+            # training and search both move onto the GPU(s). The HNSW branch
+            # stays on CPU: the GPU cloner has no graph index support.
+            if torch.cuda.is_available() and hasattr(faiss, "index_cpu_to_all_gpus"):
+                index = faiss.index_cpu_to_all_gpus(index)
+            index.train(vectors)
+        else:
+            # 8-bit scalar quantization: a quarter of the fp32 bytes per
+            # vector, so the graph search touches 4x less memory.
+            index = faiss.IndexHNSWSQ(vectors.shape[1], faiss.ScalarQuantizer.QT_8bit, 32, faiss.METRIC_INNER_PRODUCT)
+            index.train(vectors)
+        index.add(vectors)
+        
+        self.vectorstore = FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=InMemoryDocstore({str(i): chunk for i, chunk in enumerate(chunks)}),
+            index_to_docstore_id={i: str(i) for i in range(len(chunks))},
+            # the wrapper must keep normalizing on its own add/search calls,
+            # or vectors added later carry raw norms into the IP index
+            normalize_L2=True,
+        )
     
     def query(self, question: str) -> QueryResult:
         """Query the vector store and return an answer and its sources."""
-        docs = self.vectorstore.similarity_search(question, k=3)
+        # Pull a wide candidate set cheaply, then let the cross-encoder
+        # rescore those 10 pairs and keep the best 3.
+        candidates = self.vectorstore.similarity_search(question, k=10)
+        scores = self.reranker.predict([(question, doc.page_content) for doc in candidates])
+        ranked = sorted(zip(scores, candidates), key=lambda pair: pair[0], reverse=True)
+        docs = [doc for _, doc in ranked[:3]]
         
-        context = "\n\n".join([f"Source: {doc.metadata['title']}\n{doc.page_content}" for doc in docs])
+        # Truncated passages keep the prompt (and its token cost) bounded.
+        context = "\n\n".join([f"Source: {doc.metadata['title']}\n{doc.page_content[:1500]}" for doc in docs])
         
         prompt = f"""Answer based on this context: {context}
                      Question: {question}
                      Answer:"""
         
-        response = self.model.generate_content(prompt)
+        response = self.model.generate_content(prompt, generation_config={"max_output_tokens": 512})
         
         sources = [{"url": doc.metadata["source"], "title": doc.metadata["title"]} for doc in docs]
         return QueryResult(answer=response.text, sources=sources)
 
 class WebSearchRAG:
     """Orchestrates web search, scraping, and RAG pipeline for user queries."""
+    _CACHE_TTL = 300
+    
     def __init__(self):
         """Initialize the web scraper and RAG system."""
         self.scraper = WebScraper()
         self.rag = RAGSystem()
+        self._result_cache: Dict[str, Any] = {}
     
     def search_and_answer(self, query: str) -> QueryResult:
         """Run web search, scrape content, build vector store, and answer the query."""
+        # A repeated query within the TTL skips search, scraping, indexing,
+        # and the model call entirely.
+        cache_key = hashlib.sha256(query.strip().lower().encode()).hexdigest()
+        cached = self._result_cache.get(cache_key)
+        if cached is not None and time.monotonic() - cached[0] < self._CACHE_TTL:
+            return cached[1]
+        
         search_result = fallback_search.invoke(query)
         search_results = search_result.get("final_result", [])
         
-        scraped_data = self.scraper.scrape_from_search(search_results)
+        # Skip scraping URLs whose content is already in the vector store.
+        fresh_results = [result for result in search_results
+                         if result.get('source', '') not in self.rag.known_urls]
+        scraped_data = self.scraper.scrape_from_search(fresh_results)
         self.rag.build_vectorstore(scraped_data)
         
-        return self.rag.query(query)
+        result = self.rag.query(query)
+        self._result_cache[cache_key] = (time.monotonic(), result)
+        return result
 
 if __name__ == "__main__":
     system = WebSearchRAG()
@@ -7,6 +7,8 @@
 """
 
 import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import List, Dict, Any, Optional
 
 from pydantic import BaseModel, Field
@@ -96,32 +98,47 @@ def run_duckduckgo_search(query: str) -> SearchResponse:
         return SearchResponse(success=False, error=str(e))
 
 
+def _race_searches(query: str) -> Optional[SearchResponse]:
+    """Run all agents concurrently and return the first successful response.
+
+    Preference order (SerpAPI > Tavily > DuckDuckGo) is kept as a 50ms
+    head start per rank rather than a hard wait, so a slow preferred
+    agent never blocks the others from answering.
+    """
+    def attempt(rank: int, search_fn) -> SearchResponse:
+        if rank:
+            time.sleep(0.05 * rank)
+        return search_fn(query)
+
+    # A dedicated executor shut down with wait=False is what makes this a
+    # real race: running threads can't be cancelled, so the losers are
+    # left to finish (discarded) in the background while the winner
+    # returns immediately.
+    executor = ThreadPoolExecutor(max_workers=3)
+    pending = {executor.submit(attempt, rank, fn)
+               for rank, fn in enumerate([run_serp_search, run_tavily_search, run_duckduckgo_search])}
+    winner = None
+    try:
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if result.success:
+                    winner = result
+                    break
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return winner
+
+
 @tool
 def fallback_search(query: str) -> Dict[str, Any]:
     """
-    Fallback search function that tries SerpAPI, then Tavily, then DuckDuckGo.
-    Returns the first successful search result.
+    Fallback search function that races SerpAPI, Tavily, and DuckDuckGo
+    concurrently. Returns the first successful search result.
     """
-    
-    # Try SerpAPI first
-    result = run_serp_search(query)
-    if result.success:
-        return {
-            "agent": result.agent_used,
-            "final_result": [r.model_dump() for r in result.results]
-        }
-
-    # Try Tavily
-    result = run_tavily_search(query)
-    if result.success:
-        return {
-            "agent": result.agent_used,
-            "final_result": [r.model_dump() for r in result.results]
-        }
-    
-    # Try DuckDuckGo
-    result = run_duckduckgo_search(query)
-    if result.success:
+    result = _race_searches(query)
+    if result is not None:
         return {
             "agent": result.agent_used,
             "final_result": [r.model_dump() for r in result.results]
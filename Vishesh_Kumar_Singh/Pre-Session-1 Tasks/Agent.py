@@ -1,6 +1,12 @@
 import dotenv
 dotenv.load_dotenv()
 
+import hashlib
+import faiss
+import numpy as np
+import torch
+from diskcache import Cache
+
 from langchain.chat_models import init_chat_model
 from langchain_core.messages import HumanMessage
 from langgraph.checkpoint.memory import MemorySaver
@@ -8,6 +14,7 @@ from langgraph.graph import START, MessagesState, StateGraph
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain.schema import Document
 from Web_Search import WebSearch, scrape_page
@@ -29,7 +36,45 @@ def web_results(results):
                 scraped_results.append(doc)
     return scraped_results if scraped_results else "ERROR"
 
-embed_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+emb_cache = Cache("./emb_cache")
+
+# Embeddings are cached on disk keyed by text hash + model name, so chunks
+# seen in an earlier run (or earlier query) never go through the model again
+class CachedEmbeddings(HuggingFaceEmbeddings):
+    def _key(self, text):
+        return hashlib.blake2b(text.encode(), digest_size=16).hexdigest() + "|" + self.model_name
+
+    def embed_documents(self, texts):
+        vectors = [emb_cache.get(self._key(text)) for text in texts]
+        misses = [i for i, vector in enumerate(vectors) if vector is None]
+        if misses:
+            fresh = super().embed_documents([texts[i] for i in misses])
+            for i, vector in zip(misses, fresh):
+                emb_cache.set(self._key(texts[i]), vector)
+                vectors[i] = vector
+        return vectors
+
+# Batched, normalized encoding on whatever device is around: the default
+# encodes chunks in small batches of 32 on cpu even when a gpu is free.
+# The onnx backend (via optimum + onnxruntime) is tried first since its
+# fused kernels encode about twice as fast on cpu; plain torch otherwise.
+_device = "cuda" if torch.cuda.is_available() else "cpu"
+try:
+    embed_model = CachedEmbeddings(
+        model_name="sentence-transformers/all-MiniLM-L6-v2",
+        model_kwargs={"backend": "onnx", "device": _device},
+        encode_kwargs={"batch_size": 64, "normalize_embeddings": True},
+    )
+except Exception:
+    embed_model = CachedEmbeddings(
+        model_name="sentence-transformers/all-MiniLM-L6-v2",
+        model_kwargs={"device": _device},
+        encode_kwargs={"batch_size": 64, "normalize_embeddings": True},
+    )
+
+# Built once: the splitter compiles its separator regexes at construction,
+# no reason to redo that on every query
+text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
 
 
 def RAG(query):
@@ -39,10 +84,21 @@ def RAG(query):
         return "ERROR: Failed to scrape web results"
 
     print("Encoding text...")
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
     all_splits = text_splitter.split_documents(scraped_docs)
     texts = [doc.page_content for doc in all_splits]
-    vectorstore = FAISS.from_texts(texts, embed_model)
+    # HNSW graph over fp16-stored vectors: half the fp32 bytes with near
+    # lossless recall, and graph search instead of a full scan per query.
+    # Inner product is cosine since the embeddings come out normalized.
+    vectors = np.asarray(embed_model.embed_documents(texts), dtype=np.float32)
+    index = faiss.index_factory(vectors.shape[1], "HNSW32,SQfp16", faiss.METRIC_INNER_PRODUCT)
+    index.train(vectors)
+    index.add(vectors)
+    vectorstore = FAISS(
+        embedding_function=embed_model,
+        index=index,
+        docstore=InMemoryDocstore({str(i): doc for i, doc in enumerate(all_splits)}),
+        index_to_docstore_id={i: str(i) for i in range(len(all_splits))},
+    )
 
     print("Retrieving Relevant Information...")
     retriever = vectorstore.as_retriever(search_kwargs={"k": 5})
@@ -108,13 +108,26 @@ def WebSearch(query):
         return tavily_results
     
 
+# Keep at most this much of a page; giant bodies are mostly boilerplate
+MAX_BYTES = 2_000_000
+
 # Scraping Function using BeautifulSoup to scrape the whole website
 def scrape_page(url):
     try:
-        response = requests.get(url, timeout=10, headers={"User-Agent": "Mozilla/5.0"})
+        response = requests.get(url, timeout=10, stream=True,
+                                headers={"User-Agent": "Mozilla/5.0", "Accept-Encoding": "gzip, br"})
         response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, "html.parser")
+
+        # stream in chunks and bail once the cap is reached
+        parts, received = [], 0
+        for chunk in response.iter_content(chunk_size=65536):
+            parts.append(chunk)
+            received += len(chunk)
+            if received >= MAX_BYTES:
+                break
+        response.close()
+
+        soup = BeautifulSoup(b"".join(parts), "html.parser")
 
         paragraphs = [p.get_text() for p in soup.find_all("p")]
         text = "\n".join(paragraphs)
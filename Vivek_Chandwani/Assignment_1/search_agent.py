@@ -1,3 +1,6 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
 from langchain.agents import initialize_agent, tool
 from dotenv import load_dotenv
 from langchain_community.tools import TavilySearchResults, DuckDuckGoSearchResults
@@ -67,25 +70,46 @@ def safe_duckduckgo_search(query: str):
     except Exception as e:
         return {"success": False, "results": [], "error": str(e)}
     
+def _first_successful_search(query: str):
+    """
+    Runs all three searches at once and returns the first success. Lower
+    ranked providers get a 50ms head start per rank, so Tavily usually
+    wins when healthy but a hung provider no longer blocks the answer.
+    """
+    providers = [("Tavily Search", safe_tavily_search),
+                 ("SERP Search", safe_serp_search),
+                 ("DuckDuckGo Search", safe_duckduckgo_search)]
+
+    def attempt(rank, agent, search_fn):
+        if rank:
+            time.sleep(0.05 * rank)
+        return agent, search_fn(query)
+
+    # Own executor, shut down with wait=False: threads can't be cancelled
+    # mid-request, so the losers are left to finish in the background
+    # while the first success returns right away.
+    executor = ThreadPoolExecutor(max_workers=3)
+    pending = {executor.submit(attempt, rank, agent, fn)
+               for rank, (agent, fn) in enumerate(providers)}
+    try:
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                agent, result = future.result()
+                if result["success"]:
+                    return {"agent" : agent, "final_result" : result["results"]}
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return {"error": "All searches failed", "final_result": []}
+
+
 @tool
 def fallback_search(query: str):
     """
-    Fallback search function that tries Tavily, then SerpAPI, and finally DuckDuckGo.
-    Returns the first successful search result.
+    Fallback search function that races Tavily, SerpAPI, and DuckDuckGo
+    concurrently. Returns the first successful search result.
     """
-    result = safe_tavily_search(query)
-    if result["success"]:
-        return {"agent" : "Tavily Search", "final_result" : result["results"]}
-    
-    result = safe_serp_search(query)
-    if result["success"]:
-        return {"agent" : "SERP Search", "final_result" : result["results"]}
-    
-    result = safe_duckduckgo_search(query)
-    if result["success"]:
-        return {"agent" : "DuckDuckGo Search", "final_result" : result["results"]}
-    
-    return {"error": "All searches failed", "final_result": []}
+    return _first_successful_search(query)
 
 
 
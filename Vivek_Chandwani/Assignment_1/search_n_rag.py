@@ -1,8 +1,11 @@
+import hashlib
+import time
+
 from search_agent import fallback_search
 from dotenv import load_dotenv
-from langchain_huggingface import HuggingFaceEndpointEmbeddings, ChatHuggingFace, HuggingFaceEndpoint
+from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
+from langchain_community.vectorstores import FAISS
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
@@ -10,6 +13,19 @@ from langchain_core.documents import Document
 
 load_dotenv()
 
+# One splitter for the module's lifetime instead of a fresh one per call
+splitter = RecursiveCharacterTextSplitter(
+    chunk_size=500,
+    chunk_overlap=150
+)
+
+# Local MiniLM loaded once at import: embedding happens in-process in one
+# batched call instead of a network round trip per chunk to the HF endpoint
+embeddings = HuggingFaceEmbeddings(
+    model_name="sentence-transformers/all-MiniLM-L6-v2",
+    encode_kwargs={"batch_size": 64, "normalize_embeddings": True}
+)
+
 def get_content(query: str):
     content = []
     try:
@@ -22,22 +38,30 @@ def get_content(query: str):
 
 def split(docs):
     documents = [Document(page_content = doc) for doc in docs]
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=500,
-        chunk_overlap=150
-    )
     return splitter.split_documents(documents)
 
+# The store survives across queries; chunks are added once, keyed by a
+# digest of their content, so overlapping searches reuse old embeddings
+_vector_store = None
+_indexed_chunks = set()
+
 def store(chunks):
-    embeddings = HuggingFaceEndpointEmbeddings(
-        model="sentence-transformers/all-MiniLM-L6-v2"
-    )
+    global _vector_store
+    new_chunks = []
+    for chunk in chunks:
+        digest = hashlib.blake2b(chunk.page_content.encode(), digest_size=16).digest()
+        if digest not in _indexed_chunks:
+            _indexed_chunks.add(digest)
+            new_chunks.append(chunk)
 
-    return Chroma.from_documents(
-        documents=chunks,
-        embedding=embeddings,
-        collection_name="SEARCH_RESULTS"
-    )
+    if _vector_store is None:
+        _vector_store = FAISS.from_documents(
+            documents=new_chunks,
+            embedding=embeddings
+        )
+    elif new_chunks:
+        _vector_store.add_documents(new_chunks)
+    return _vector_store
 
 template = PromptTemplate(
     template = "Answer the question based on the provided context: \n Context: {context} \n Question: {question}\n Also provide the exact reference from the document",
@@ -52,7 +76,16 @@ llm = HuggingFaceEndpoint(
 
 model = ChatHuggingFace(llm = llm)
 
+# Answers served within the TTL skip search, embedding and the LLM call
+_ANSWER_CACHE = {}
+_ANSWER_TTL = 300
+
 def retrieve_and_answer(query: str):
+    cache_key = hashlib.sha256(query.strip().lower().encode()).hexdigest()
+    cached = _ANSWER_CACHE.get(cache_key)
+    if cached is not None and time.monotonic() - cached[0] < _ANSWER_TTL:
+        return cached[1]
+
     content = get_content(query)
     if not content:
         return "No content found for the query."
@@ -75,6 +108,7 @@ def retrieve_and_answer(query: str):
     })
     
     if final:
+        _ANSWER_CACHE[cache_key] = (time.monotonic(), final)
         return final
     else:
         return "No relevant information found."